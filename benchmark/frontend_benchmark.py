@@ -0,0 +1,57 @@
+#-----------------------------------------------------------------
+# compares the pycparser front end with the token based one
+# - run from the repository root: python benchmark/frontend_benchmark.py [FILES ...]
+# - by default the C test suites and the uninstrumented benchmark programs are used
+# - the scanned headers are cached (scan_header), the tokenizer is timed cold (the cache is
+#   cleared before every call, as in a single ccov run over one file) and warm (the headers of
+#   the previous calls are reused, as for the files of a directory sharing their headers)
+#-----------------------------------------------------------------
+import glob
+import sys
+import time
+
+sys.path.extend(['.', '..'])
+
+from src.instrumentation import get_instrumentation_info
+from src.tokenizer import get_fast_instrumentation_info, scan_header
+
+runs = 20
+
+
+def average_runtime(function, c_file, setup=None):
+    # the setup runs before every call, it isn't timed
+    total_time = 0
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start_time = time.perf_counter()
+        result = function(c_file)
+        total_time += time.perf_counter() - start_time
+    return total_time / runs * 1000, result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        c_files = sys.argv[1:]
+    else:
+        c_files = sorted(glob.glob('tests/cfiles/*/*.c')) + sorted(glob.glob('benchmark/*_uninstrumented.c'))
+
+    print("Benchmarking front ends...")
+    pycparser_total, cold_total, warm_total, fallbacks = 0, 0, 0, 0
+    for c_file in c_files:
+        pycparser_avg, _ = average_runtime(get_instrumentation_info, c_file)
+        cold_avg, result = average_runtime(get_fast_instrumentation_info, c_file, setup=scan_header.cache_clear)
+        warm_avg, _ = average_runtime(get_fast_instrumentation_info, c_file)
+        pycparser_total += pycparser_avg
+        cold_total += cold_avg
+        warm_total += warm_avg
+        print(f"{c_file}: pycparser {pycparser_avg:.3f} ms, tokenizer cold {cold_avg:.3f} ms, "
+              f"warm {warm_avg:.3f} ms")
+        if result is None:
+            fallbacks += 1
+            print(f"  {c_file} falls back to pycparser")
+
+    print("---------------------------------")
+    print(f"pycparser total average runtime: {pycparser_total:.3f} ms")
+    print(f"tokenizer total average runtime: cold {cold_total:.3f} ms, warm {warm_total:.3f} ms")
+    print(f"{fallbacks} of {len(c_files)} files fall back to pycparser")
@@ -1,10 +1,15 @@
 import os
+import sys
 import argparse
 import shutil
 import subprocess
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 
-from src.utils import copy_tree, HASH
+from src.utils import copy_tree, normalize_filename, HASH
 from src.instrumentation import instrument_files, construct_c_helpers
+from src.impact import (read_input_sets, input_set_key, hash_sources, load_store, save_store, select_input_sets,
+                        coverage_to_record, record_to_coverage)
 
 
 # prepares the output files/directory and copies the inputs to them
@@ -61,55 +66,220 @@ def preprocess_files(args):
     return source_dir, path_to_process, file_translation
 
 
-def compile_and_run(c_files, output_path, executable_args=[], executable_name=f"a.out_{HASH}"):
+# the output of the compiler and of the executables is never buffered as a whole, it is copied
+# from the pipes chunk by chunk, so the memory use doesn't depend on the volume of the output
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+@contextmanager
+def output_sinks(log_file=None):
+    # yields the (stdout, stderr) binary streams the output of a child process is copied to
+    if log_file is None:
+        # the progress messages are printed through the text layer, flush them first
+        sys.stdout.flush()
+        sys.stderr.flush()
+        yield sys.stdout.buffer, sys.stderr.buffer
+    else:
+        with open(log_file, 'ab') as f:
+            yield f, f
+
+
+def stream_output(pipe, sink, output_limit=None):
+    # once output_limit bytes have been copied, the rest of the output is still read
+    # (otherwise the child would block on a full pipe) but dropped
+    total = 0
+    while True:
+        chunk = pipe.read1(STREAM_BUFFER_SIZE)
+        if not chunk:
+            break
+        if output_limit is None:
+            sink.write(chunk)
+        elif total < output_limit:
+            sink.write(chunk[:output_limit - total])
+        sink.flush()
+        total += len(chunk)
+
+    if output_limit is not None and total > output_limit:
+        sink.write(f"\n[ccov: output truncated, {total - output_limit} of {total} bytes dropped]\n".encode())
+        sink.flush()
+    return total
+
+
+def run_process(command, log_file=None, output_limit=None):
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # both pipes must be drained at the same time, otherwise the child can block on a full one
+    with output_sinks(log_file) as (stdout_sink, stderr_sink), ThreadPoolExecutor(max_workers=2) as executor:
+        streams = [executor.submit(stream_output, process.stdout, stdout_sink, output_limit),
+                   executor.submit(stream_output, process.stderr, stderr_sink, output_limit)]
+        for stream in streams:
+            stream.result()
+
+    return process.wait()
+
+
+def compile_executable(c_files, output_path, executable_name=f"a.out_{HASH}", log_file=None, output_limit=None):
     # full path to the output executable
     executable_path = os.path.join(output_path, executable_name)
 
     command = ["gcc", "-O0", "-o", executable_path] + c_files
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    returncode = run_process(command, log_file, output_limit)
 
-    stdout, stderr = process.communicate()
-
-    if process.returncode != 0:
-        print(f"Compilation failed with error code {process.returncode}.")
-        print(stderr.decode("utf-8"))
+    if returncode != 0:
+        print(f"Compilation failed with error code {returncode}.")
     else:
         print(f"Compilation successful. Executable named '{executable_name}' has been created at '{output_path}'.")
+    return returncode == 0
+
 
+def run_executable(output_path, executable_name, executable_args=[], log_file=None, output_limit=None):
     # changing to the output directory to run the executable
     original_working_directory = os.getcwd()
     os.chdir(output_path)
 
+    print("Output from the executable:" if log_file is None else f"Output from the executable is written to '{log_file}'.")
     command = [f"./{executable_name}"] + executable_args
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    stdout, stderr = process.communicate()
+    returncode = run_process(command, log_file, output_limit)
 
-    print("Output from the executable:")
-    print(stdout.decode("utf-8"))
-
-    if stderr:
-        print("Errors/warnings from the executable:")
-        print(stderr.decode("utf-8"))
+    if returncode != 0:
+        print(f"The executable exited with error code {returncode}.")
 
     os.chdir(original_working_directory)
+    return returncode
+
+
+def object_file_path(c_file):
+    return f"{os.path.splitext(c_file)[0]}_{HASH}.o"
+
+
+def executable_name_for(main_file):
+    return f"a.out_{HASH}_{normalize_filename(os.path.basename(main_file))}"
+
 
+# multi-target build:
+# - the shared sources (everything except the translation units with a main) are compiled
+#   to object files only once
+# - then one executable per main translation unit is linked against those objects
+# - both the compilation and the linking run in parallel, the executables are run sequentially
+#   (see run_input_sets) because they all append to the same instrumentation info file
+def compile_targets(shared_files, main_files, output_path, jobs=None, log_file=None, output_limit=None):
+    def run_gcc(command):
+        return run_process(command, log_file, output_limit)
 
-def convert_to_lcov(source_dir, output_path, file_to_lf, file_translation):
+    objects = [object_file_path(c_file) for c_file in shared_files]
+    commands = [["gcc", "-O0", "-c", "-o", obj, c_file] for c_file, obj in zip(shared_files, objects)]
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(run_gcc, commands))
+
+    failed = False
+    for c_file, returncode in zip(shared_files, results):
+        if returncode != 0:
+            failed = True
+            print(f"Compilation of '{c_file}' failed with error code {returncode}.")
+    if failed:
+        return []
+
+    executable_names = [executable_name_for(main_file) for main_file in main_files]
+    commands = [["gcc", "-O0", "-o", os.path.join(output_path, name), main_file] + objects
+                for main_file, name in zip(main_files, executable_names)]
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        results = list(executor.map(run_gcc, commands))
+
+    built = []
+    for name, returncode in zip(executable_names, results):
+        if returncode != 0:
+            print(f"Compilation of '{name}' failed with error code {returncode}.")
+        else:
+            print(f"Compilation successful. Executable named '{name}' has been created at '{output_path}'.")
+            built.append(name)
+
+    return built
+
+
+# runs all the executables once per input set, the coverage of each input set is kept
+# separately so that it can be stored for the test-impact selection
+# - also returns the keys of the input sets whose coverage is incomplete: an executable failed
+#   (e.g. crashed before the atexit handler wrote its hits) or no coverage was written at all,
+#   such records must not be stored, otherwise they would be reused instead of being rerun
+def run_input_sets(executables, output_path, input_sets, log_file=None, output_limit=None):
+    info_file = os.path.join(output_path, f"instrumentation_info_{HASH}.txt")
+
+    records, incomplete = {}, set()
+    for input_set in input_sets:
+        if os.path.exists(info_file):
+            os.remove(info_file)
+        failed = False
+        for name in executables:
+            failed |= run_executable(output_path, name, input_set, log_file, output_limit) != 0
+        key = input_set_key(input_set)
+        if failed or not os.path.exists(info_file):
+            incomplete.add(key)
+        coverage = read_instrumentation_info(info_file) if os.path.exists(info_file) else {}
+        records[key] = coverage_to_record(input_set, coverage, output_path)
+    return records, incomplete
+
+
+def read_instrumentation_info(input_file):
+    with open(input_file, 'r') as infile:
+        lines = infile.readlines()
+
+    # the same file can be reported several times (e.g. by multiple executables
+    # in a multi-target build), so the hits are summed per file first
+    merged = {}
+    for line in lines:
+        file_path, coverage_info = line.strip().split(":")
+        hits = [int(h) for h in coverage_info.split(',')]
+        if file_path in merged:
+            merged[file_path] = [a + b for a, b in zip(merged[file_path], hits)]
+        else:
+            merged[file_path] = hits
+    return merged
+
+
+def write_instrumentation_info(output_file, coverages):
+    # same format as the one written by the instrumented executables
+    with open(output_file, 'w') as outfile:
+        for coverage in coverages:
+            for file_path, hits in coverage.items():
+                outfile.write(f"{file_path}:{','.join(str(h) for h in hits)}\n")
+
+
+def convert_to_lcov(source_dir, output_path, file_to_lf, file_translation, file_to_functions={}):
     input_file = os.path.join(output_path, f"instrumentation_info_{HASH}.txt")
     output_file = os.path.join(source_dir, "lcov.info")
 
-    with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
-        lines = infile.readlines()
+    merged = read_instrumentation_info(input_file)
 
-        for line in lines:
-            file_path, coverage_info = line.strip().split(":")
+    with open(output_file, 'w') as outfile:
+        for file_path, coverage_data in merged.items():
             file_path_normalized = file_path.replace(output_path, '', 1).lstrip('/') if not file_translation else file_translation[file_path]
-            coverage_data = coverage_info.split(',')
 
             if any(int(hits) > 0 for hits in coverage_data):
                 outfile.write(f"TN:test\n")
                 outfile.write(f"SF:{file_path_normalized}\n")
 
+                # the function records are derived from the line counters, the call count of
+                # a function is the hit count of the first statement of its body, if that
+                # statement has no probe (e.g. a while loop), it's the count of the first hit
+                # probe of the body, which is only an estimate but never 0 for a called function
+                functions = file_to_functions.get(file_path)
+                if functions is not None:
+                    for function in functions:
+                        outfile.write(f"FN:{function.start_line},{function.name}\n")
+                    fnh = 0
+                    for function in functions:
+                        if function.entry_line is not None:
+                            calls = coverage_data[function.entry_line - 1]
+                        else:
+                            body = coverage_data[function.start_line - 1:function.end_line]
+                            calls = next((hits for hits in body if hits > 0), 0)
+                        fnh += calls > 0
+                        outfile.write(f"FNDA:{calls},{function.name}\n")
+                    outfile.write(f"FNF:{len(functions)}\n")
+                    outfile.write(f"FNH:{fnh}\n")
+
                 for i, hits in enumerate(coverage_data):
                     if int(hits) > 0:  # Write only lines with non-zero hits
                         outfile.write(f"DA:{i + 1},{hits}\n")
@@ -135,6 +305,29 @@ def get_cli_args():
     parser.add_argument('-i', '--input-args', nargs='*', default=[],
                         help='specifies input arguments to be passed to the C binary during execution')
 
+    parser.add_argument('-s', '--input-sets',
+                        help='specifies a file with one set of input arguments per line, the C binary is run '
+                             'once per set (instead of once with --input-args)')
+    parser.add_argument('-S', '--impact-store',
+                        help='specifies a file storing the coverage of every input set, only the input sets '
+                             'which covered a changed file are rerun, the others reuse the stored coverage')
+
+    parser.add_argument('-m', '--multi-target', action='store_true',
+                        help='builds one executable per C file with a main function, the other C files are '
+                             'compiled only once and linked into each of them')
+    parser.add_argument('-t', '--fast-frontend', action='store_true',
+                        help='finds the statements from the tokens instead of preprocessing and parsing '
+                             'the files with pycparser, unsupported files fall back to pycparser')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of parallel compiler processes in the multi-target mode')
+
+    parser.add_argument('-l', '--log-file',
+                        help='appends the output of the compiler and of the C binary to the given file '
+                             'instead of printing it to the console')
+    parser.add_argument('-L', '--output-limit', type=int, default=None,
+                        help='keeps at most this many bytes of each output stream of the compiler and of the '
+                             'C binary, the rest is dropped')
+
     args = parser.parse_args()
     return args
 
@@ -146,17 +339,59 @@ def main():
 
     assert path is not None, "Error: No input file or directory specified."
 
-    c_files, file_lens, file_to_lf = instrument_files(path)
+    input_sets = read_input_sets(args.input_sets) if args.input_sets else [args.input_args]
+    # the sources must be hashed before the instrumentation modifies them
+    source_hashes = hash_sources(path) if args.impact_store else None
+
+    c_files, file_lens, file_to_lf, main_files, file_to_functions = instrument_files(path, args.multi_target, args.fast_frontend)
     # we need to gather all the relevant .c files to perform compilation, this includes
     # the helper .c file which includes the definitions of functions for writing the coverage
     # info to the file
-    c_files.append(construct_c_helpers(c_files, file_lens, path))
+    helper_file = construct_c_helpers(c_files, file_lens, path)
 
     output_path = path if os.path.isdir(path) else os.path.dirname(path)
 
-    compile_and_run(c_files, output_path, args.input_args)
-
-    convert_to_lcov(source_dir, output_path, file_to_lf, file_translation)
+    # the executables are run from the output directory
+    log_file = os.path.abspath(args.log_file) if args.log_file else None
+
+    to_run, reused = input_sets, {}
+    if args.impact_store:
+        to_run, reused = select_input_sets(load_store(args.impact_store), input_sets, source_hashes)
+        print(f"Test-impact selection: running {len(to_run)} of {len(input_sets)} input sets, "
+              f"the coverage of the others is reused from '{args.impact_store}'.")
+
+    executables = []
+    if to_run:
+        if args.multi_target:
+            shared_files = [c_file for c_file in c_files if c_file not in main_files] + [helper_file]
+            executables = compile_targets(shared_files, main_files, output_path, args.jobs,
+                                          log_file, args.output_limit)
+        elif compile_executable(c_files + [helper_file], output_path,
+                                log_file=log_file, output_limit=args.output_limit):
+            executables = [f"a.out_{HASH}"]
+
+    # no report is better than an empty or partial one passing for the real thing
+    if to_run and len(executables) != (len(main_files) if args.multi_target else 1):
+        print("Error: Not all the executables could be built, no coverage report is written.")
+        sys.exit(1)
+
+    records, incomplete = {}, set()
+    if executables:
+        records, incomplete = run_input_sets(executables, output_path, to_run, log_file, args.output_limit)
+    records.update(reused)
+
+    # the lcov.info is generated from the coverage of all the input sets, including the reused ones
+    root_files = {os.path.relpath(c_file, output_path): c_file for c_file in c_files}
+    write_instrumentation_info(os.path.join(output_path, f"instrumentation_info_{HASH}.txt"),
+                               [record_to_coverage(record, root_files) for record in records.values()])
+
+    # the store is only updated if all the selected input sets have been run, the incomplete
+    # records are left out so that their input sets are rerun the next time
+    if args.impact_store and (executables or not to_run):
+        save_store(args.impact_store, source_hashes,
+                   {key: record for key, record in records.items() if key not in incomplete})
+
+    convert_to_lcov(source_dir, output_path, file_to_lf, file_translation, file_to_functions)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,115 @@
+import os
+import json
+import shlex
+import hashlib
+
+from src.instrumentation import is_helper_file
+
+
+# test-impact selection
+# - the store keeps the hashes of the sources and, for every input set, the lines it covered
+# - the lines of a file are kept as a bitset (bit i set <=> line i + 1 was hit) together with
+#   the hit counts of the set bits, so the coverage of an input set can be reused as is
+# - an input set is rerun only if it covered a changed file, a changed header reruns everything
+#   (we don't track which .c files include it) and so does a changed .c file no input set covered
+STORE_VERSION = 1
+
+
+def read_input_sets(input_sets_file):
+    # one set of input arguments per line, blank lines and comments are skipped
+    with open(input_sets_file, 'r') as f:
+        return [shlex.split(line) for line in f
+                if line.strip() and not line.lstrip().startswith('#')]
+
+
+def input_set_key(input_set):
+    return json.dumps(input_set)
+
+
+def hash_sources(path):
+    # keys are relative to the directory being processed, so they don't depend on where it is
+    if os.path.isfile(path):
+        root = os.path.dirname(path)
+        files = [path]
+    else:
+        root = path
+        files = [os.path.join(dirpath, file)
+                 for dirpath, dirs, filenames in os.walk(path)
+                 for file in filenames if file.endswith(('.c', '.h')) and not is_helper_file(file)]
+
+    hashes = {}
+    for file in files:
+        with open(file, 'rb') as f:
+            hashes[os.path.relpath(file, root)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def load_store(store_path):
+    empty_store = {"version": STORE_VERSION, "sources": {}, "inputs": {}}
+    if not os.path.exists(store_path):
+        return empty_store
+    with open(store_path, 'r') as f:
+        store = json.load(f)
+    if store.get("version") != STORE_VERSION:
+        print(f"Warning: Ignoring the impact store '{store_path}' written by another version.")
+        return empty_store
+    return store
+
+
+def save_store(store_path, source_hashes, records):
+    store = {"version": STORE_VERSION, "sources": source_hashes, "inputs": records}
+    with open(store_path, 'w') as f:
+        json.dump(store, f)
+
+
+def changed_files(store, source_hashes):
+    return {file for file in store["sources"].keys() | source_hashes.keys()
+            if store["sources"].get(file) != source_hashes.get(file)}
+
+
+def select_input_sets(store, input_sets, source_hashes):
+    """
+    Splits the input sets into the ones to run and the stored records which can be reused.
+    """
+    changed = changed_files(store, source_hashes)
+    # a .c file no input set covered may still matter: a file with only data (tables,
+    # constants) has no probes at all, so like a header, its change reruns everything
+    covered = {file for record in store["inputs"].values() for file in record["coverage"]}
+    rerun_all = any(not file.endswith('.c') or file not in covered for file in changed)
+
+    to_run, reused = [], {}
+    for input_set in input_sets:
+        key = input_set_key(input_set)
+        record = store["inputs"].get(key)
+        if record is None or rerun_all or any(file in record["coverage"] for file in changed):
+            to_run.append(input_set)
+        else:
+            reused[key] = record
+    return to_run, reused
+
+
+def coverage_to_record(input_set, coverage, root):
+    # coverage maps the file paths to the hit counts of their lines
+    record = {"args": input_set, "coverage": {}}
+    for file_path, hits in coverage.items():
+        lines = 0
+        for i, h in enumerate(hits):
+            if h > 0:
+                lines |= 1 << i
+        if lines:
+            record["coverage"][os.path.relpath(file_path, root)] = {
+                "len": len(hits),
+                "lines": format(lines, 'x'),
+                "hits": [h for h in hits if h > 0],
+            }
+    return record
+
+
+def record_to_coverage(record, root_files):
+    # root_files maps the keys of the record to the current file paths
+    coverage = {}
+    for file, data in record["coverage"].items():
+        lines = int(data["lines"], 16)
+        hit_counts = iter(data["hits"])
+        coverage[root_files[file]] = [next(hit_counts) if lines >> i & 1 else 0 for i in range(data["len"])]
+    return coverage
@@ -4,8 +4,9 @@ from pycparser.c_ast import FuncDef
 from pycparser import parse_file
 
 
-from src.utils import normalize_filename, HASH
-from src.visitors import InstrumentationVisitor
+from src.utils import normalize_filename, FunctionInfo, HASH
+from src.visitors import InstrumentationVisitor, MaxLineVisitor, get_entry_line
+from src.tokenizer import get_fast_instrumentation_info
 
 
 def instrument_file(input_file, root, main_coords, instrumentation_info):
@@ -38,7 +39,12 @@ def instrument_file(input_file, root, main_coords, instrumentation_info):
     return file_len
 
 
-def instrument_files(path):
+def is_helper_file(file):
+    # the helper files generated by a previous run into the same output directory
+    return os.path.basename(file) in (f"instrumentation_{HASH}.c", f"instrumentation_{HASH}.h")
+
+
+def instrument_files(path, multi_target=False, fast_frontend=False):
     if os.path.isfile(path):
         root = os.path.dirname(path)
         c_files = [path]
@@ -46,39 +52,57 @@ def instrument_files(path):
         root = path
         c_files = [os.path.join(root, file)
                    for root, dirs, files in os.walk(path)
-                   for file in files if file.endswith('.c')]
+                   for file in files if file.endswith('.c') and not is_helper_file(file)]
 
     file_lens = {}
     file_to_lf = {}
+    file_to_functions = {}
     main_coords = [None] * len(c_files)
 
     # Instrument each .c file
     # - we must do so because even though we run the preprocessor on all
     #   the files, the .c files are not aware of each other
     for i, c_file in enumerate(c_files):
-        instrumentation_info, mc = get_instrumentation_info(c_file)
+        instrumentation_info, mc, functions = get_instrumentation_info(c_file, fast_frontend)
         file_to_lf[c_file] = len(instrumentation_info)
+        file_to_functions[c_file] = functions
         main_coords[i] = mc
 
         file_len = instrument_file(c_file, root, main_coords[i], instrumentation_info)
         file_lens[c_file] = file_len
 
-    assert sum(x is not None for x in main_coords) == 1, "There should be exactly one main function."
+    main_files = [c_file for c_file, mc in zip(c_files, main_coords) if mc is not None]
+    if multi_target:
+        # every translation unit with a main becomes its own executable, the rest is shared
+        assert len(main_files) >= 1, "There should be at least one main function."
+    else:
+        assert len(main_files) == 1, "There should be exactly one main function."
 
-    return c_files, file_lens, file_to_lf
+    return c_files, file_lens, file_to_lf, main_files, file_to_functions
 
 
-def get_instrumentation_info(input_file):
+def get_instrumentation_info(input_file, fast_frontend=False):
+    # the token based front end skips the preprocessing and the full parse, the files
+    # it can't handle confidently go through pycparser
+    if fast_frontend:
+        result = get_fast_instrumentation_info(input_file)
+        if result is not None:
+            return result
+
     ast = parse_file(input_file, use_cpp=True,
                      cpp_path='gcc',
                      cpp_args=['-E', r'-Ifake_libc_include'])
 
     lv = InstrumentationVisitor()
+    max_line_visitor = MaxLineVisitor()
     main_coords = []
+    functions = []
     # visit only the bodies of the function definitions
     for node in ast.ext:
         if isinstance(node, FuncDef):
             lv.visit(node.body)
+            functions.append(FunctionInfo(node.decl.name, node.decl.coord.line,
+                                          max_line_visitor.get_max_line(node.body), get_entry_line(node)))
             if node.decl.name == "main":
                 main_coords.append(node.body.coord)
 
@@ -87,7 +111,7 @@ def get_instrumentation_info(input_file):
     # ast.show(showcoord=True)
 
     # for main_coords returns either None or the first element of the list
-    return lv.get_instrumentation_info(), next(iter(main_coords), None)
+    return lv.get_instrumentation_info(), next(iter(main_coords), None), functions
 
 
 def construct_c_helpers(c_files, file_lens, path):
@@ -97,7 +121,10 @@ def construct_c_helpers(c_files, file_lens, path):
     contents_c = f"#include \"instrumentation_{HASH}.h\"\n"
 
     for file in c_files:
-        contents_h += f"int instrumentation_{normalize_filename(file)}[{file_lens[file]}];\n"
+        # the arrays are only declared in the header and defined once in the helper .c file,
+        # otherwise each translation unit would define them and linking would fail with -fno-common
+        contents_h += f"extern int instrumentation_{normalize_filename(file)}[{file_lens[file]}];\n"
+        contents_c += f"int instrumentation_{normalize_filename(file)}[{file_lens[file]}];\n"
 
     contents_h += f"void write_file_instrumentation_info_{HASH}(char* file, int* arr, int len);\n"
     contents_h += f"void write_instrumentation_info_{HASH}();\n"
@@ -142,3 +169,4 @@ void write_file_instrumentation_info_{HASH}(char* file, int* arr, int len) {{
         f.write(contents_c)
 
     return filename + '.c'
+
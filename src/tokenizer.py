@@ -0,0 +1,638 @@
+import os
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+from src.utils import FunctionInfo
+
+
+# lightweight front end which finds the instrumentation points straight from the token stream
+# - no preprocessing and no full parse of the headers (fake_libc_include included)
+# - it mimics what InstrumentationVisitor computes on the pycparser AST, so it has to
+#   reproduce the same columns (see the comments in visitors.py)
+# - whenever a construct can't be handled confidently, Unsupported is raised and the
+#   caller falls back to the pycparser based front end
+
+FAKE_LIBC_INCLUDE = 'fake_libc_include'
+
+Token = namedtuple('Token', ['kind', 'text', 'line', 'column'])
+# mirrors pycparser's Coord (only line and column are used by instrument_file)
+Coord = namedtuple('Coord', ['line', 'column'])
+
+TOKEN_RE = re.compile(r'''
+    (?P<newline>\n)
+  | (?P<space>[ \t\r\f\v]+)
+  | (?P<line_comment>//[^\n]*)
+  | (?P<block_comment>/\*.*?\*/)
+  | (?P<string>L?"(?:[^"\\\n]|\\[^\n])*")
+  | (?P<char>L?'(?:[^'\\\n]|\\[^\n])*')
+  | (?P<number>\.?[0-9](?:[eEpP][+-]|[\w.])*)
+  | (?P<ident>[A-Za-z_]\w*)
+  | (?P<punct>\.\.\.|<<=|>>=|->|\+\+|--|<<|>>|<=|>=|==|!=|&&|\|\||[*/%+\-&^|]=|\#\#
+              |[\[\](){}.&*+\-~!/%<>^|?:;=,\#])
+''', re.VERBOSE | re.DOTALL)
+DIRECTIVE_RE = re.compile(r'#(?:[^\n\\]|\\.)*', re.DOTALL)
+
+TYPE_KEYWORDS = {'void', 'char', 'short', 'int', 'long', 'float', 'double', 'signed', 'unsigned',
+                 '_Bool', '_Complex'}
+QUALIFIERS = {'const', 'volatile', 'restrict', 'static', 'extern', 'register', 'auto', 'inline'}
+KEYWORDS = TYPE_KEYWORDS | QUALIFIERS | {
+    'struct', 'union', 'enum', 'typedef', 'sizeof', 'if', 'else', 'for', 'while', 'do', 'switch',
+    'case', 'default', 'break', 'continue', 'goto', 'return', '_Alignas', '_Alignof', '_Atomic',
+    '_Generic', '_Noreturn', '_Static_assert', '_Thread_local', 'asm', '__asm__', '__attribute__',
+    '__extension__', '__typeof__', 'typeof', '__inline', '__inline__', '__restrict'}
+ASSIGNMENT_OPS = {'=', '+=', '-=', '*=', '/=', '%=', '&=', '|=', '^=', '<<=', '>>='}
+# tokens an object-like macro can expand to without changing the shape of the statement
+SAFE_MACRO_KINDS = {'number', 'string', 'char'}
+SAFE_MACRO_PUNCTS = {'-', '+', '~'}
+
+
+class Unsupported(Exception):
+    pass
+
+
+def tokenize(text):
+    tokens = []
+    pos, line, line_start = 0, 1, 0
+    at_line_start = True
+    while pos < len(text):
+        if at_line_start and text[pos] == '#':
+            match = DIRECTIVE_RE.match(text, pos)
+            kind = 'directive'
+        else:
+            match = TOKEN_RE.match(text, pos)
+            if match is None:
+                if text.startswith('\\\n', pos):
+                    raise Unsupported(f"line continuation at line {line}")
+                raise Unsupported(f"unexpected character {text[pos]!r} at line {line}")
+            kind = match.lastgroup
+
+        value = match.group()
+        if kind not in ('newline', 'space', 'line_comment', 'block_comment'):
+            tokens.append(Token(kind, value, line, pos - line_start + 1))
+            at_line_start = False
+
+        newlines = value.count('\n')
+        if newlines:
+            line += newlines
+            line_start = pos + value.rindex('\n') + 1
+            # a directive can only start a line (block comments don't end one)
+            at_line_start = kind != 'block_comment' or at_line_start
+        pos = match.end()
+    return tokens
+
+
+def find_closing(tokens, i):
+    # returns the index of the bracket closing the one at index i
+    depth = 0
+    for j in range(i, len(tokens)):
+        if tokens[j].text in ('(', '[', '{'):
+            depth += 1
+        elif tokens[j].text in (')', ']', '}'):
+            depth -= 1
+            if depth == 0:
+                return j
+    raise Unsupported(f"unbalanced bracket at line {tokens[i].line}")
+
+
+def find_statement_end(tokens, i):
+    # returns the index of the ';' ending the statement that starts at index i
+    j = i
+    while j < len(tokens):
+        if tokens[j].text in ('(', '[', '{'):
+            j = find_closing(tokens, j)
+        elif tokens[j].text in (')', ']', '}'):
+            break
+        elif tokens[j].text == ';':
+            return j
+        j += 1
+    raise Unsupported(f"unterminated statement at line {tokens[i].line}")
+
+
+def parse_directive(token):
+    match = re.match(r'#\s*(\w*)\s*(.*)', token.text, re.DOTALL)
+    return match.group(1), match.group(2).strip()
+
+
+def resolve_include(argument, current_dir):
+    if argument.startswith('"') and argument.endswith('"'):
+        search_dirs = [current_dir, FAKE_LIBC_INCLUDE]
+    elif argument.startswith('<') and argument.endswith('>'):
+        search_dirs = [FAKE_LIBC_INCLUDE]
+    else:
+        raise Unsupported(f"computed include {argument}")
+
+    for directory in search_dirs:
+        candidate = os.path.normpath(os.path.join(directory, argument[1:-1]))
+        if os.path.isfile(candidate):
+            return candidate
+    raise Unsupported(f"include {argument} not found")
+
+
+def collect_typedef_names(tokens, i, j):
+    # names declared by the typedef spanning tokens[i:j] (j is the terminating ';')
+    names = set()
+    last_ident = None
+    k = i + 1
+    while k < j:
+        token = tokens[k]
+        if token.text == '(' and tokens[k + 1].text == '*':
+            # function pointer, the name is inside the parentheses
+            close = find_closing(tokens, k)
+            idents = [t.text for t in tokens[k:close] if t.kind == 'ident' and t.text not in KEYWORDS]
+            last_ident = idents[-1] if idents else last_ident
+            k = close
+        elif token.text in ('(', '[', '{'):
+            k = find_closing(tokens, k)
+        elif token.text == ',':
+            names.add(last_ident)
+        elif token.kind == 'ident' and token.text not in KEYWORDS:
+            last_ident = token.text
+        k += 1
+    if last_ident is None:
+        raise Unsupported(f"unnamed typedef at line {tokens[i].line}")
+    names.add(last_ident)
+    return names
+
+
+class FileScope:
+    """
+    Typedef names, macros and function bodies of a file and everything it includes.
+    """
+    def __init__(self):
+        self.typedefs = set()
+        self.macros = {}
+        # the replacement text of each macro, to detect redefinitions
+        self.definitions = {}
+        self.function_bodies = []
+
+    def merge(self, other):
+        for macro, definition in other.definitions.items():
+            self.check_redefinition(macro, definition)
+        self.typedefs |= other.typedefs
+        self.macros.update(other.macros)
+        self.definitions.update(other.definitions)
+
+    def check_redefinition(self, macro, definition):
+        # the conditionals of headers aren't evaluated, a different definition of the same
+        # macro may come from a branch the preprocessor would skip
+        if self.definitions.get(macro, definition) != definition:
+            raise Unsupported(f"macro {macro} redefined")
+
+    def add_directive(self, token, current_dir):
+        name, rest = parse_directive(token)
+        if name == 'include':
+            self.merge(scan_header(resolve_include(rest, current_dir)))
+        elif name == 'define':
+            match = re.match(r'(\w+)(\(?)(.*)', rest, re.DOTALL)
+            if match is None:
+                raise Unsupported(f"malformed #define at line {token.line}")
+            macro, function_like, replacement = match.groups()
+            definition = (function_like, [t.text for t in tokenize(replacement)])
+            self.check_redefinition(macro, definition)
+            self.definitions[macro] = definition
+            self.macros[macro] = None if function_like else tokenize(replacement)
+
+    def is_guard(self, tokens, i):
+        # `#ifndef X` directly followed by `#define X` (an include guard or a default definition),
+        # its branch is taken if X isn't defined yet
+        _, tested = parse_directive(tokens[i])
+        if tested in self.macros or i + 1 >= len(tokens) or tokens[i + 1].kind != 'directive':
+            return False
+        name, rest = parse_directive(tokens[i + 1])
+        defined = re.match(r'\w+', rest)
+        return name == 'define' and defined is not None and defined.group() == tested
+
+    def scan(self, tokens, current_dir, is_header):
+        # walks the top level declarations, only function bodies are kept for later
+        # - the conditionals of headers aren't evaluated: they are either guards (True on the stack,
+        #   see is_guard) or opaque (False), nothing affecting the scope may depend on an opaque one
+        conditionals = []
+        i = 0
+        declaration_start = 0
+        while i < len(tokens):
+            token = tokens[i]
+            if token.kind == 'directive':
+                name, _ = parse_directive(token)
+                if not is_header and name not in ('include', 'define', 'pragma'):
+                    raise Unsupported(f"#{name} at line {token.line}")
+                if name in ('if', 'ifdef', 'ifndef'):
+                    conditionals.append(name == 'ifndef' and self.is_guard(tokens, i))
+                elif name in ('elif', 'else'):
+                    if not conditionals or conditionals[-1]:
+                        raise Unsupported(f"#{name} of a guard at line {token.line}")
+                elif name == 'endif':
+                    if not conditionals:
+                        raise Unsupported(f"unbalanced #endif at line {token.line}")
+                    conditionals.pop()
+                elif name in ('include', 'define'):
+                    if not all(conditionals):
+                        raise Unsupported(f"#{name} inside a conditional at line {token.line}")
+                    self.add_directive(token, current_dir)
+                i += 1
+                declaration_start = i
+            elif token.text == ';':
+                if tokens[declaration_start].text == 'typedef':
+                    if not all(conditionals):
+                        raise Unsupported(f"typedef inside a conditional at line {token.line}")
+                    self.typedefs |= collect_typedef_names(tokens, declaration_start, i)
+                i += 1
+                declaration_start = i
+            elif token.text in ('(', '['):
+                i = find_closing(tokens, i) + 1
+            elif token.text == '{':
+                close = find_closing(tokens, i)
+                declaration = tokens[declaration_start:i]
+                if i == declaration_start:
+                    raise Unsupported(f"unsupported definition at line {token.line}")
+                if any(t.text == '=' for t in declaration) or tokens[i - 1].text != ')':
+                    # an initializer or a struct/union/enum body
+                    i = close + 1
+                    continue
+                self.function_bodies.append((function_name(declaration), i, close))
+                i = close + 1
+                declaration_start = i
+            else:
+                i += 1
+
+
+def function_name(declaration):
+    k = 0
+    while k < len(declaration):
+        token = declaration[k]
+        if token.text == '__attribute__':
+            k = find_closing(declaration, k + 1) + 1
+            continue
+        if token.text == '(':
+            if k > 0 and declaration[k - 1].kind == 'ident' and declaration[k - 1].text not in KEYWORDS:
+                return declaration[k - 1]
+            break
+        k += 1
+    raise Unsupported(f"unrecognized function definition at line {declaration[0].line}")
+
+
+# headers whose scan is in progress
+# - the conditionals of headers are ignored, so include guards don't stop headers which
+#   include each other, such a cycle would recurse forever
+scanning_headers = set()
+
+
+@lru_cache(maxsize=None)
+def scan_header(path):
+    if path in scanning_headers:
+        raise Unsupported(f"include cycle through {path}")
+    with open(path, 'r') as file:
+        tokens = tokenize(file.read())
+    scope = FileScope()
+    scanning_headers.add(path)
+    try:
+        scope.scan(tokens, os.path.dirname(path), is_header=True)
+    finally:
+        scanning_headers.discard(path)
+    # pycparser would visit the bodies defined in headers as well
+    if scope.function_bodies:
+        raise Unsupported(f"function definition in header {path}")
+    return scope
+
+
+class StatementScanner:
+    """
+    Computes the same instrumentation info as InstrumentationVisitor, but from the tokens
+    of function bodies.
+    """
+    def __init__(self, tokens, scope):
+        self.tokens = tokens
+        self.scope = scope
+        self.instrumentation_info = {}
+        # index of the first token of a statement -> line of its own probe
+        self.statement_probes = {}
+        # the ';' of empty statements, unlike the other ones, are nodes in the AST
+        self.empty_statements = set()
+
+    def _add_info(self, token, statement):
+        line = token.line
+        if line not in self.instrumentation_info:
+            self.instrumentation_info[line] = set()
+        self.instrumentation_info[line].add(token.column)
+        self.statement_probes[statement] = line
+
+    def get_instrumentation_info(self):
+        for line in self.instrumentation_info.keys():
+            self.instrumentation_info[line] = min(self.instrumentation_info[line])
+        return self.instrumentation_info
+
+    def is_type_name(self, token):
+        return token.text in TYPE_KEYWORDS or token.text in ('struct', 'union', 'enum') \
+            or (token.kind == 'ident' and token.text in self.scope.typedefs)
+
+    def is_call(self, i):
+        if self.tokens[i].text != '(' or i == 0:
+            return False
+        previous = self.tokens[i - 1]
+        return (previous.kind == 'ident' and previous.text not in KEYWORDS) or previous.text in (')', ']')
+
+    def has_side_effects(self, i, j):
+        # any call or assignment in tokens[i:j] would be instrumented by the visitor
+        return any(self.is_call(k) or self.tokens[k].text in ASSIGNMENT_OPS for k in range(i, j))
+
+    def check_expression(self, i, j):
+        for k in range(i, j):
+            token = self.tokens[k]
+            # casts and sizeof(type) have nodes without coordinates which the visitor can't handle
+            if token.text == '(' and k + 1 < j and (self.is_type_name(self.tokens[k + 1])
+                                                    or self.tokens[k + 1].text in QUALIFIERS):
+                raise Unsupported(f"type name in expression at line {token.line}")
+            if token.text == '{' or token.kind == 'directive' or token.text in KEYWORDS - {'sizeof'}:
+                raise Unsupported(f"unexpected {token.text!r} in expression at line {token.line}")
+
+    def check_continuation(self, i, j, start):
+        # the nodes of a statement spanning several lines must not add probes to the other
+        # lines nor lower the minimal column of the first one
+        for k in range(i, j):
+            token = self.tokens[k]
+            if token.line == start.line:
+                continue
+            if token.column < start.column or self.is_call(k) or token.text in ASSIGNMENT_OPS:
+                raise Unsupported(f"statement spanning several lines at line {start.line}")
+
+    def expect(self, i, text):
+        if self.tokens[i].text != text:
+            raise Unsupported(f"expected {text!r} at line {self.tokens[i].line}")
+        return i + 1
+
+    def parse_condition(self, i):
+        # parses '(' cond ')' of while/do/switch, the visitor would instrument calls inside it
+        close = find_closing(self.tokens, self.expect(i, '(') - 1)
+        self.check_expression(i + 1, close)
+        if self.has_side_effects(i + 1, close):
+            raise Unsupported(f"call or assignment in a condition at line {self.tokens[i].line}")
+        return close + 1
+
+    def parse_compound(self, i):
+        i = self.expect(i, '{')
+        while self.tokens[i].text != '}':
+            i = self.parse_statement(i)
+        return i + 1
+
+    def parse_statement(self, i):
+        token = self.tokens[i]
+        text = token.text
+        following = self.tokens[i + 1].text if i + 1 < len(self.tokens) else None
+
+        if text == '{':
+            return self.parse_compound(i)
+        if text == ';':
+            self.empty_statements.add(i)
+            return i + 1
+        if text == 'if':
+            self._add_info(token, i)
+            close = find_closing(self.tokens, self.expect(i + 1, '(') - 1)
+            self.check_expression(i + 2, close)
+            self.check_continuation(i + 2, close, token)
+            i = self.parse_statement(close + 1)
+            if self.tokens[i].text == 'else':
+                i = self.parse_statement(i + 1)
+            return i
+        if text == 'for':
+            self._add_info(token, i)
+            close = find_closing(self.tokens, self.expect(i + 1, '(') - 1)
+            # the visitor skips the header and only visits the children of the body
+            if self.tokens[close + 1].text == '{':
+                return self.parse_compound(close + 1)
+            body = close + 1
+            end = find_statement_end(self.tokens, body)
+            if body == end:
+                self.empty_statements.add(end)
+            self.check_expression(body, end)
+            # the root of the body (a call or an assignment) itself isn't instrumented
+            if self.tokens[body].kind == 'ident' and self.tokens[body + 1].text == '(' \
+                    and find_closing(self.tokens, body + 1) == end - 1:
+                body += 2
+            elif self.tokens[body].kind == 'ident' and self.is_lvalue_assignment(body, end):
+                while self.tokens[body].text not in ASSIGNMENT_OPS:
+                    body += 1
+                body += 1
+            if self.has_side_effects(body, end):
+                raise Unsupported(f"for loop without a compound body at line {token.line}")
+            return end + 1
+        if text == 'while' or text == 'switch':
+            return self.parse_statement(self.parse_condition(i + 1))
+        if text == 'do':
+            i = self.expect(self.parse_statement(i + 1), 'while')
+            return self.expect(self.parse_condition(i), ';')
+        if text == 'case':
+            colon = i + 1
+            while self.tokens[colon].text != ':':
+                if self.tokens[colon].text in ('?', ';', '{', '}'):
+                    raise Unsupported(f"unsupported case label at line {token.line}")
+                colon += 1
+            self.check_expression(i + 1, colon)
+            if self.has_side_effects(i + 1, colon):
+                raise Unsupported(f"call in a case label at line {token.line}")
+            return self.parse_statement(colon + 1)
+        if text == 'default':
+            return self.parse_statement(self.expect(i + 1, ':'))
+        if text in ('break', 'continue'):
+            return self.expect(i + 1, ';')
+        if text == 'goto':
+            return self.expect(i + 2, ';')
+        if text == 'return':
+            self._add_info(token, i)
+            end = find_statement_end(self.tokens, i + 1)
+            self.check_expression(i + 1, end)
+            self.check_continuation(i + 1, end, token)
+            return end + 1
+        if token.kind == 'ident' and text not in KEYWORDS and following == ':' \
+                and text not in self.scope.typedefs:
+            # label
+            return self.parse_statement(i + 2)
+        if text in QUALIFIERS or self.is_type_name(token):
+            return self.parse_declaration(i)
+        if text in KEYWORDS - {'sizeof'} or token.kind == 'directive':
+            raise Unsupported(f"unsupported statement {text!r} at line {token.line}")
+        return self.parse_expression_statement(i)
+
+    def parse_declaration(self, i):
+        start = i
+        while self.tokens[i].text in QUALIFIERS:
+            i += 1
+        type_token = self.tokens[i]
+        if type_token.text in ('struct', 'union'):
+            type_token = self.tokens[i + 1]
+            if type_token.kind != 'ident' or self.tokens[i + 2].text == '{':
+                raise Unsupported(f"struct definition inside a function at line {type_token.line}")
+            i += 2
+        elif type_token.text in TYPE_KEYWORDS:
+            while self.tokens[i].text in TYPE_KEYWORDS or self.tokens[i].text in QUALIFIERS:
+                i += 1
+        elif type_token.text in self.scope.typedefs:
+            i += 1
+        else:
+            raise Unsupported(f"unsupported declaration at line {type_token.line}")
+
+        end = find_statement_end(self.tokens, i)
+        if i == end:
+            raise Unsupported(f"declaration without a declarator at line {type_token.line}")
+
+        # declarators are separated by top-level commas, each one is a Decl node whose
+        # minimal column is the column of the type
+        k = i
+        first = True
+        while k < end:
+            declarator_start = k
+            name = None
+            while k < end and self.tokens[k].text not in ('=', ','):
+                token = self.tokens[k]
+                if token.text == '[':
+                    self.check_expression(k + 1, find_closing(self.tokens, k))
+                    k = find_closing(self.tokens, k)
+                elif token.kind == 'ident' and token.text not in KEYWORDS:
+                    if name is not None:
+                        raise Unsupported(f"unsupported declarator at line {token.line}")
+                    name = token
+                elif token.text != '*' and token.text not in QUALIFIERS:
+                    raise Unsupported(f"unsupported declarator at line {token.line}")
+                k += 1
+            if name is None or name.line != type_token.line \
+                    or self.tokens[declarator_start].line != type_token.line:
+                raise Unsupported(f"unsupported declarator at line {type_token.line}")
+            if first:
+                self._add_info(type_token, start)
+                first = False
+            if k < end and self.tokens[k].text == '=':
+                initializer_start = k + 1
+                while k < end and self.tokens[k].text != ',':
+                    if self.tokens[k].text in ('(', '[', '{'):
+                        k = find_closing(self.tokens, k)
+                    k += 1
+                self.check_initializer(initializer_start, k)
+            if k < end:
+                k += 1
+        self.check_continuation(start, end, type_token)
+        return end + 1
+
+    def check_initializer(self, i, j):
+        # initializer lists are fine, other braces (e.g. statement expressions) are not
+        k = i
+        while k < j:
+            if self.tokens[k].text == '{':
+                close = find_closing(self.tokens, k)
+                self.check_initializer(k + 1, close)
+                k = close + 1
+                continue
+            self.check_expression(k, k + 1)
+            k += 1
+
+    def parse_expression_statement(self, i):
+        start = self.tokens[i]
+        end = find_statement_end(self.tokens, i)
+        self.check_expression(i, end)
+
+        top_level = []
+        k = i
+        while k < end:
+            top_level.append(k)
+            if self.tokens[k].text in ('(', '[', '{'):
+                k = find_closing(self.tokens, k)
+            k += 1
+        top_level_texts = [self.tokens[k].text for k in top_level]
+
+        if ',' in top_level_texts:
+            if self.has_side_effects(i, end):
+                raise Unsupported(f"unsupported expression statement at line {start.line}")
+            return end + 1
+
+        if start.kind == 'ident' and start.text not in KEYWORDS:
+            following = self.tokens[i + 1]
+            # the assignment binds looser than '?:', so it is the root of the expression
+            if self.is_lvalue_assignment(i, end) or (following.text == '(' and '?' not in top_level_texts):
+                self.check_continuation(i, end, start)
+                self._add_info(start, i)
+                return end + 1
+            if following.kind == 'ident' or following.text == '*':
+                # e.g. a declaration with a type we don't know about
+                raise Unsupported(f"ambiguous statement at line {start.line}")
+
+        if self.has_side_effects(i, end):
+            raise Unsupported(f"unsupported expression statement at line {start.line}")
+        return end + 1
+
+    def is_lvalue_assignment(self, i, end):
+        # IDENT followed by subscripts and member accesses and an assignment operator
+        k = i + 1
+        while k < end:
+            text = self.tokens[k].text
+            if text == '[':
+                k = find_closing(self.tokens, k) + 1
+            elif text in ('.', '->') and self.tokens[k + 1].kind == 'ident':
+                k += 2
+            else:
+                return text in ASSIGNMENT_OPS
+        return False
+
+    def check_macros(self, i, j):
+        # the preprocessor shifts the columns of everything that follows an expanded macro,
+        # so a macro may only appear after the probe of its line
+        for k in range(i, j):
+            token = self.tokens[k]
+            if token.kind != 'ident' or token.text not in self.scope.macros:
+                continue
+            if not self.is_safe_macro(token.text, set()):
+                raise Unsupported(f"macro {token.text} at line {token.line}")
+            probe = self.instrumentation_info.get(token.line)
+            if probe is not None and min(probe) > token.column:
+                raise Unsupported(f"macro {token.text} before a probe at line {token.line}")
+
+    def is_safe_macro(self, name, seen):
+        replacement = self.scope.macros[name]
+        if replacement is None or not replacement or name in seen:
+            return False
+        for token in replacement:
+            if token.kind == 'ident':
+                if token.text in KEYWORDS or token.text in self.scope.typedefs:
+                    return False
+                if token.text in self.scope.macros and not self.is_safe_macro(token.text, seen | {name}):
+                    return False
+            elif token.kind not in SAFE_MACRO_KINDS and token.text not in SAFE_MACRO_PUNCTS:
+                return False
+        return True
+
+
+def scan_file(input_file):
+    with open(input_file, 'r') as file:
+        tokens = tokenize(file.read())
+
+    scope = FileScope()
+    scope.scan(tokens, os.path.dirname(input_file), is_header=False)
+    scanner = StatementScanner(tokens, scope)
+
+    main_coords = []
+    functions = []
+    for name, start, end in scope.function_bodies:
+        scanner.parse_compound(start)
+        # same as MaxLineVisitor, the closing brackets and semicolons have no nodes
+        last = max(k for k in range(start, end)
+                   if tokens[k].text not in ('}', ';', ')', ']') or k in scanner.empty_statements)
+        functions.append(FunctionInfo(name.text, name.line, tokens[last].line,
+                                      scanner.statement_probes.get(start + 1)))
+        if name.text == "main":
+            main_coords.append(Coord(tokens[start].line, tokens[start].column))
+
+    for name, start, end in scope.function_bodies:
+        scanner.check_macros(start, end)
+
+    if len(main_coords) > 1:
+        raise Unsupported("more than one main function")
+
+    return scanner.get_instrumentation_info(), next(iter(main_coords), None), functions
+
+
+def get_fast_instrumentation_info(input_file):
+    """
+    Returns the same (instrumentation_info, main_coords, functions) as the pycparser based
+    get_instrumentation_info or None if the file can't be handled confidently.
+    """
+    try:
+        return scan_file(input_file)
+    except (Unsupported, IndexError, RecursionError):
+        return None
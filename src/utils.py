@@ -1,6 +1,7 @@
 import re
 import os
 import shutil
+from collections import namedtuple
 
 
 #keccak256("instrumentation-skrabmir")
@@ -8,6 +9,12 @@ import shutil
 HASH = "98b30b1e82017f82d4388ed4555f8f7c4053e3d1f456b1baf24e402e015a0f21"[:8]
 
 
+# function definition found while collecting the instrumentation info
+# - entry_line is the line of the probe of the first statement of the body, its counter
+#   is the number of calls of the function (None if the first statement has no probe)
+FunctionInfo = namedtuple('FunctionInfo', ['name', 'start_line', 'end_line', 'entry_line'])
+
+
 def normalize_filename(filename):
     """
     Normalize filename to be used as a C variable.
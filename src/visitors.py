@@ -1,4 +1,4 @@
-from pycparser.c_ast import NodeVisitor, FuncDef
+from pycparser.c_ast import NodeVisitor, FuncDef, FuncCall, Return, Decl, Assignment, For, If
 
 #finds (recursively) the minimal column for the provided node
 # why?
@@ -20,6 +20,38 @@ class MinColVisitor(NodeVisitor):
         return self.min
 
 
+#finds (recursively) the maximal line for the provided node
+# - pycparser doesn't record where a node ends, so the end of a function body
+#   is the last line containing a node
+class MaxLineVisitor(NodeVisitor):
+    def __init__(self):
+        self.max = None
+
+    def generic_visit(self, node):
+        for child_name, child in node.children():
+            if child.coord is not None:
+                self.max = max(self.max, child.coord.line)
+            self.visit(child)
+
+    def get_max_line(self, node):
+        self.max = node.coord.line
+        self.visit(node)
+        return self.max
+
+
+# statements which get a probe of their own from InstrumentationVisitor
+INSTRUMENTED_STATEMENTS = (FuncCall, Return, Decl, Assignment, For, If)
+
+
+def get_entry_line(func_def):
+    # the first statement of the body is executed exactly once per call, so if it has
+    # a probe, its counter is the call count of the function
+    items = func_def.body.block_items
+    if items and isinstance(items[0], INSTRUMENTED_STATEMENTS):
+        return items[0].coord.line
+    return None
+
+
 class InstrumentationVisitor(NodeVisitor):
     def __init__(self):
         self.instrumentation_info = {}
@@ -0,0 +1,8 @@
+#include <stdio.h>
+#include "lib.h"
+
+int main()
+{
+    printf("%d\n", add(1, 2));
+    return 0;
+}
@@ -1,8 +1,11 @@
+import io
+import os
 import subprocess
+import sys
 
 from unittest.mock import patch, MagicMock
 import pytest
-from src.cov import compile_and_run
+from src.cov import compile_executable, run_executable, compile_targets, stream_output, run_input_sets, main
 
 from src.utils import HASH
 
@@ -27,17 +30,28 @@ def hello_world_output():
     return "Hello, World!\n"
 
 
-def test_compile_and_run(c_files, output_path, executable_args, hello_world_output):
+def mock_popen_with_output(stdout=b"", stderr=b"", returncode=0):
+    # every process gets its own pipes, they are read until EOF
+    def popen(*args, **kwargs):
+        process = MagicMock()
+        process.stdout = io.BytesIO(stdout)
+        process.stderr = io.BytesIO(stderr)
+        process.wait.return_value = returncode
+        return process
+    return MagicMock(side_effect=popen)
+
+
+def test_compile_and_run_executable(capfd, c_files, output_path, executable_args, hello_world_output):
     executable_name = f"a.out_{HASH}"
 
-    mock_popen = MagicMock()
-    mock_popen.return_value.communicate.return_value = (hello_world_output.encode(), b"")
+    mock_popen = mock_popen_with_output(hello_world_output.encode())
 
     with patch("subprocess.Popen", mock_popen), \
          patch("os.getcwd", return_value="/original/directory"), \
          patch("os.chdir") as mock_chdir:
 
-        compile_and_run(c_files, str(output_path), executable_args, executable_name)
+        assert compile_executable(c_files, str(output_path), executable_name)
+        assert run_executable(str(output_path), executable_name, executable_args) == 0
 
         # Check if subprocess.Popen was called correctly for gcc
         mock_popen.assert_any_call(
@@ -55,8 +69,201 @@ def test_compile_and_run(c_files, output_path, executable_args, hello_world_outp
         mock_chdir.assert_any_call(str(output_path))
         mock_chdir.assert_any_call("/original/directory")
 
-        # Check if the output was correctly printed
-        # This can be done by checking the mock_popen instance's calls to communicate()
-        # and ensuring that the output matches the expected "Hello, World!\n"
-        stdout, _ = mock_popen.return_value.communicate.return_value
-        assert stdout.decode() == hello_world_output, "The output from the executable does not match the expected output."
+    # Check if the output was streamed to the console
+    stdout, _ = capfd.readouterr()
+    assert f"Output from the executable:\n{hello_world_output}" in stdout, \
+        "The output from the executable does not match the expected output."
+
+
+def test_compile_and_run_log_file(capfd, c_files, output_path, executable_args, hello_world_output, tmp_path):
+    log_file = tmp_path / "run.log"
+    mock_popen = mock_popen_with_output(hello_world_output.encode(), b"warning\n")
+
+    with patch("subprocess.Popen", mock_popen), patch("os.chdir"):
+        compile_executable(c_files, str(output_path), log_file=str(log_file))
+        run_executable(str(output_path), f"a.out_{HASH}", executable_args, log_file=str(log_file))
+
+    # the output of both the compiler and the executable goes to the log file only
+    assert log_file.read_bytes().count(hello_world_output.encode()) == 2
+    assert log_file.read_bytes().count(b"warning\n") == 2
+    stdout, stderr = capfd.readouterr()
+    assert hello_world_output not in stdout
+    assert "warning" not in stderr
+
+
+def test_stream_output():
+    sink = io.BytesIO()
+    total = stream_output(io.BytesIO(b"x" * 100), sink)
+
+    assert total == 100
+    assert sink.getvalue() == b"x" * 100
+
+
+def test_stream_output_truncates(monkeypatch):
+    # small chunks so the limit falls in the middle of one
+    monkeypatch.setattr("src.cov.STREAM_BUFFER_SIZE", 7)
+    sink = io.BytesIO()
+    total = stream_output(io.BytesIO(b"x" * 100), sink, output_limit=10)
+
+    assert total == 100
+    assert sink.getvalue() == b"x" * 10 + b"\n[ccov: output truncated, 90 of 100 bytes dropped]\n"
+
+
+def test_compile_targets(output_path):
+    shared_files = ["lib.c", f"instrumentation_{HASH}.c"]
+    main_files = ["test_add.c", "test_sub.c"]
+
+    mock_popen = mock_popen_with_output()
+
+    with patch("subprocess.Popen", mock_popen):
+        built = compile_targets(shared_files, main_files, str(output_path))
+
+    objects = [f"lib_{HASH}.o", f"instrumentation_{HASH}_{HASH}.o"]
+    assert built == [f"a.out_{HASH}_test_add_c", f"a.out_{HASH}_test_sub_c"]
+
+    # the shared files are compiled only once
+    for c_file, obj in zip(shared_files, objects):
+        mock_popen.assert_any_call(["gcc", "-O0", "-c", "-o", obj, c_file],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    # and linked into every executable
+    for main_file, name in zip(main_files, built):
+        mock_popen.assert_any_call(["gcc", "-O0", "-o", str(output_path / name), main_file] + objects,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def test_compile_targets_shared_compilation_fails(output_path):
+    mock_popen = mock_popen_with_output(stderr=b"error", returncode=1)
+
+    with patch("subprocess.Popen", mock_popen):
+        built = compile_targets(["lib.c"], ["test_add.c"], str(output_path))
+
+    # nothing is linked if the shared objects can't be built
+    assert built == []
+    assert mock_popen.call_count == 1
+
+
+def test_run_input_sets(tmp_path):
+    info_file = tmp_path / f"instrumentation_info_{HASH}.txt"
+    # every run of the executable writes its own coverage
+    outputs = iter([f"{tmp_path}/main.c:1,0\n", f"{tmp_path}/main.c:0,5\n"])
+
+    def run_executable(output_path, name, input_set, log_file, output_limit):
+        info_file.write_text(next(outputs))
+        return 0
+
+    with patch("src.cov.run_executable", side_effect=run_executable) as mock_run:
+        records, incomplete = run_input_sets(["a.out"], str(tmp_path), [["a"], ["b"]])
+
+    assert mock_run.call_count == 2
+    assert records == {
+        '["a"]': {"args": ["a"], "coverage": {"main.c": {"len": 2, "lines": "1", "hits": [1]}}},
+        '["b"]': {"args": ["b"], "coverage": {"main.c": {"len": 2, "lines": "2", "hits": [5]}}},
+    }
+    assert incomplete == set()
+
+
+def test_run_input_sets_failed_run(tmp_path):
+    info_file = tmp_path / f"instrumentation_info_{HASH}.txt"
+
+    def run_executable(output_path, name, input_set, log_file, output_limit):
+        if input_set == ["ok"]:
+            info_file.write_text(f"{tmp_path}/main.c:1,0\n")
+            return 0
+        if input_set == ["exit"]:
+            # exit(1) still runs the atexit handler
+            info_file.write_text(f"{tmp_path}/main.c:0,1\n")
+            return 1
+        # a crash (e.g. SIGSEGV) doesn't write anything
+        return -11
+
+    with patch("src.cov.run_executable", side_effect=run_executable):
+        records, incomplete = run_input_sets(["a.out"], str(tmp_path), [["ok"], ["exit"], ["crash"]])
+
+    assert incomplete == {'["exit"]', '["crash"]'}
+    assert records['["crash"]']["coverage"] == {}
+
+
+@pytest.fixture
+def impact_project(tmp_path):
+    # main dispatches to a() or b() depending on the first argument
+    source_dir = tmp_path / "src"
+    source_dir.mkdir()
+    (source_dir / "main.c").write_text(
+        "int a();\nint b();\n\nint main(int argc, char *argv[])\n{\n"
+        "    if (argv[1][0] == 'a') {\n        a();\n    }\n"
+        "    if (argv[1][0] == 'b') {\n        b();\n    }\n    return 0;\n}\n")
+    (source_dir / "a.c").write_text("int a()\n{\n    return 1;\n}\n")
+    (source_dir / "b.c").write_text("int b()\n{\n    return 2;\n}\n")
+    (tmp_path / "inputs.txt").write_text("a\nb\n")
+    return tmp_path
+
+
+def run_main(project, *extra_args):
+    argv = ["ccov", "-d", str(project / "src"), "-D", str(project / "out"),
+            "-s", str(project / "inputs.txt"), "-S", str(project / "store.json")] + list(extra_args)
+    with patch.object(sys, "argv", argv):
+        main()
+    return (project / "src" / "lcov.info").read_text()
+
+
+def test_main_input_sets_and_impact_store(capfd, impact_project):
+    lcov = run_main(impact_project)
+
+    stdout, _ = capfd.readouterr()
+    assert "running 2 of 2 input sets" in stdout
+    assert "SF:a.c" in lcov and "SF:b.c" in lcov
+    assert "DA:7,1" in lcov and "DA:10,1" in lcov
+
+    # only the input set which covered b.c is rerun, the coverage of the other one is reused
+    (impact_project / "src" / "b.c").write_text("int b()\n{\n    return 3;\n}\n")
+    lcov = run_main(impact_project)
+
+    stdout, _ = capfd.readouterr()
+    assert "running 1 of 2 input sets" in stdout
+    assert "SF:a.c" in lcov and "SF:b.c" in lcov
+
+    # nothing changed, nothing is compiled nor run
+    with patch("src.cov.compile_executable") as mock_compile, patch("src.cov.run_input_sets") as mock_run:
+        lcov = run_main(impact_project)
+
+    mock_compile.assert_not_called()
+    mock_run.assert_not_called()
+    assert "SF:a.c" in lcov and "SF:b.c" in lcov and "DA:7,1" in lcov
+
+
+def test_main_multi_target(impact_project):
+    lcov = run_main(impact_project, "-m")
+
+    assert "SF:a.c" in lcov and "SF:b.c" in lcov
+    assert os.path.exists(impact_project / "out" / f"a.out_{HASH}_main_c")
+
+
+def test_main_compilation_fails(capfd, impact_project):
+    lcov_file = impact_project / "src" / "lcov.info"
+    lcov_file.write_text("TN:test\n")
+
+    with patch("src.cov.run_process", return_value=1), pytest.raises(SystemExit) as exit_info:
+        run_main(impact_project)
+
+    assert exit_info.value.code == 1
+    stdout, _ = capfd.readouterr()
+    assert "Compilation failed with error code 1." in stdout
+    # nothing is written: neither the store, nor the coverage info, nor the report
+    assert not os.path.exists(impact_project / "store.json")
+    assert not os.path.exists(impact_project / "out" / f"instrumentation_info_{HASH}.txt")
+    assert lcov_file.read_text() == "TN:test\n"
+
+
+def test_main_multi_target_link_fails(capfd, impact_project):
+    (impact_project / "src" / "second.c").write_text("int main()\n{\n    return 0;\n}\n")
+
+    def run_process(command, log_file=None, output_limit=None):
+        # only the link of the second executable fails
+        return 1 if "-c" not in command and any(arg.endswith("second.c") for arg in command) else 0
+
+    with patch("src.cov.run_process", side_effect=run_process), pytest.raises(SystemExit) as exit_info:
+        run_main(impact_project, "-m")
+
+    assert exit_info.value.code == 1
+    assert not os.path.exists(impact_project / "src" / "lcov.info")
@@ -3,6 +3,7 @@ from unittest.mock import mock_open, patch, MagicMock
 
 from src.cov import convert_to_lcov
 from src.cov import preprocess_files
+from src.utils import FunctionInfo
 
 
 @pytest.fixture
@@ -54,6 +55,66 @@ def test_convert_to_lcov(mocker, mock_file_contents, file_to_lf, file_translatio
     write_mock.assert_has_calls(expected_calls, any_order=True)
 
 
+def test_convert_to_lcov_merges_repeated_files(mocker, file_to_lf, file_translation):
+    # e.g. two executables of a multi-target build reporting the same file
+    contents = [
+        'tmp/main.c:1,0,1,0',
+        'tmp/main.c:0,0,2,0',
+    ]
+
+    read_mock = mock_open(read_data="\n".join(contents))
+    write_mock = mock_open()
+    mocker.patch('builtins.open', side_effect=[read_mock.return_value, write_mock.return_value])
+
+    convert_to_lcov('source_dir', 'some_path', file_to_lf, file_translation)
+
+    written = [c.args[0] for c in write_mock().write.call_args_list]
+    assert written == [
+        "TN:test\n",
+        "SF:src/main.c\n",
+        "DA:1,1\n",
+        "DA:3,3\n",
+        "LH:2\n",
+        "LF:4\n",
+        "end_of_record\n",
+    ]
+
+
+def test_convert_to_lcov_functions(mocker, file_to_lf, file_translation):
+    contents = ['tmp/main.c:0,3,1,0,2']
+    file_to_functions = {'tmp/main.c': [
+        FunctionInfo('helper', 1, 2, 2),
+        FunctionInfo('unused', 4, 4, 4),
+        FunctionInfo('spin', 5, 6, None),
+    ]}
+
+    read_mock = mock_open(read_data="\n".join(contents))
+    write_mock = mock_open()
+    mocker.patch('builtins.open', side_effect=[read_mock.return_value, write_mock.return_value])
+
+    convert_to_lcov('source_dir', 'some_path', file_to_lf, file_translation, file_to_functions)
+
+    written = [c.args[0] for c in write_mock().write.call_args_list]
+    assert written == [
+        "TN:test\n",
+        "SF:src/main.c\n",
+        "FN:1,helper\n",
+        "FN:4,unused\n",
+        "FN:5,spin\n",
+        "FNDA:3,helper\n",
+        "FNDA:0,unused\n",
+        "FNDA:2,spin\n",
+        "FNF:3\n",
+        "FNH:2\n",
+        "DA:2,3\n",
+        "DA:3,1\n",
+        "DA:5,2\n",
+        "LH:3\n",
+        "LF:4\n",
+        "end_of_record\n",
+    ]
+
+
 @pytest.fixture
 def mock_args():
     return MagicMock()
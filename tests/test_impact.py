@@ -0,0 +1,113 @@
+import pytest
+
+from src.utils import HASH
+from src.impact import (read_input_sets, input_set_key, hash_sources, load_store, save_store, select_input_sets,
+                        coverage_to_record, record_to_coverage)
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    (tmp_path / "main.c").write_text("int main() { return 0; }\n")
+    (tmp_path / "lib.c").write_text("int lib() { return 0; }\n")
+    (tmp_path / "lib.h").write_text("int lib();\n")
+    (tmp_path / "notes.txt").write_text("not a source\n")
+    return tmp_path
+
+
+@pytest.fixture
+def records():
+    return {
+        input_set_key(["a"]): coverage_to_record(["a"], {"out/main.c": [1, 0], "out/a.c": [0, 2, 0]}, "out"),
+        input_set_key(["b"]): coverage_to_record(["b"], {"out/main.c": [1, 0], "out/b.c": [3]}, "out"),
+    }
+
+
+def test_read_input_sets(tmp_path):
+    input_sets_file = tmp_path / "inputs.txt"
+    input_sets_file.write_text("a 1\n\n# comment\n'b c' 2\n")
+
+    assert read_input_sets(str(input_sets_file)) == [["a", "1"], ["b c", "2"]]
+
+
+def test_hash_sources(source_dir):
+    hashes = hash_sources(str(source_dir))
+
+    assert sorted(hashes.keys()) == ["lib.c", "lib.h", "main.c"]
+
+    # the helper files left by a previous run into the same output directory aren't sources
+    (source_dir / f"instrumentation_{HASH}.c").write_text("int instrumentation_main_c[1];\n")
+    (source_dir / f"instrumentation_{HASH}.h").write_text("extern int instrumentation_main_c[1];\n")
+    assert hash_sources(str(source_dir)) == hashes
+
+    (source_dir / "lib.c").write_text("int lib() { return 1; }\n")
+    changed = hash_sources(str(source_dir))
+    assert changed["lib.c"] != hashes["lib.c"]
+    assert changed["main.c"] == hashes["main.c"]
+
+
+def test_coverage_to_record():
+    record = coverage_to_record(["a"], {"out/main.c": [1, 0, 4, 0], "out/unused.c": [0, 0]}, "out")
+
+    # only the hit lines are stored: bits 0 and 2, with their hit counts
+    assert record == {"args": ["a"], "coverage": {"main.c": {"len": 4, "lines": "5", "hits": [1, 4]}}}
+
+
+def test_record_to_coverage():
+    coverage = {"out/main.c": [1, 0, 4, 0], "out/lib.c": [0, 7]}
+    record = coverage_to_record(["a"], coverage, "out")
+
+    assert record_to_coverage(record, {"main.c": "out/main.c", "lib.c": "out/lib.c"}) == coverage
+
+
+def test_select_input_sets(records):
+    store = {"version": 1, "sources": {"main.c": "1", "a.c": "2", "b.c": "3"}, "inputs": records}
+    input_sets = [["a"], ["b"], ["new"]]
+
+    to_run, reused = select_input_sets(store, input_sets, {"main.c": "1", "a.c": "2", "b.c": "changed"})
+
+    # ["a"] didn't cover b.c, ["new"] has never been run
+    assert to_run == [["b"], ["new"]]
+    assert reused == {input_set_key(["a"]): records[input_set_key(["a"])]}
+
+
+def test_select_input_sets_nothing_changed(records):
+    sources = {"main.c": "1", "a.c": "2", "b.c": "3"}
+    store = {"version": 1, "sources": sources, "inputs": records}
+
+    to_run, reused = select_input_sets(store, [["a"], ["b"]], sources)
+
+    assert to_run == []
+    assert reused == records
+
+
+def test_select_input_sets_changed_header(records):
+    store = {"version": 1, "sources": {"main.c": "1", "lib.h": "2"}, "inputs": records}
+
+    to_run, reused = select_input_sets(store, [["a"], ["b"]], {"main.c": "1", "lib.h": "changed"})
+
+    assert to_run == [["a"], ["b"]]
+    assert reused == {}
+
+
+def test_select_input_sets_changed_uncovered_file(records):
+    # tables.c holds only data, there are no probes in it, so no record mentions it
+    store = {"version": 1, "sources": {"main.c": "1", "a.c": "2", "b.c": "3", "tables.c": "4"}, "inputs": records}
+
+    to_run, reused = select_input_sets(store, [["a"], ["b"]],
+                                       {"main.c": "1", "a.c": "2", "b.c": "3", "tables.c": "changed"})
+
+    assert to_run == [["a"], ["b"]]
+    assert reused == {}
+
+
+def test_store_roundtrip(tmp_path, records):
+    store_path = str(tmp_path / "store.json")
+
+    assert load_store(store_path)["inputs"] == {}
+
+    save_store(store_path, {"main.c": "1"}, records)
+    store = load_store(store_path)
+
+    assert store["sources"] == {"main.c": "1"}
+    assert store["inputs"] == records
+
@@ -2,8 +2,8 @@ import os
 import pytest
 from unittest.mock import mock_open, patch, call, MagicMock
 
-from src.instrumentation import construct_c_helpers, instrument_file, get_instrumentation_info
-from src.utils import HASH
+from src.instrumentation import construct_c_helpers, instrument_file, instrument_files, get_instrumentation_info
+from src.utils import FunctionInfo, HASH
 
 @pytest.fixture
 def c_files():
@@ -108,8 +108,67 @@ def c_file(tmp_path):
 
 
 def test_get_instrumentation_info_with_real_file(c_file):
-    instrumentation_info, main_coords = get_instrumentation_info(c_file)
+    instrumentation_info, main_coords, functions = get_instrumentation_info(c_file)
 
     assert instrumentation_info == {5: 5, 6: 5}, "Incorrect instrumentation_info"
     assert main_coords is None, "Expected main_coords to not be None"
+    assert functions == [FunctionInfo('foo', 4, 6, 5)], "Incorrect functions"
 
+
+c_file_functions_content = """
+int square(int x)
+{
+    return x * x;
+}
+
+void spin(int n)
+{
+    while (n > 0) {
+        n = n - 1;
+    }
+}
+
+int main()
+{
+    spin(square(2));
+    return 0;
+}
+"""
+
+
+def test_get_instrumentation_info_functions(tmp_path):
+    temp_c_file = tmp_path / "functions.c"
+    temp_c_file.write_text(c_file_functions_content)
+
+    _, main_coords, functions = get_instrumentation_info(str(temp_c_file))
+
+    assert functions == [
+        FunctionInfo('square', 2, 4, 4),
+        # the first statement is a loop without a probe of its own, so the call count is unknown
+        FunctionInfo('spin', 7, 10, None),
+        FunctionInfo('main', 14, 17, 16),
+    ]
+    assert main_coords.line == 15
+
+
+
+@pytest.fixture
+def multi_target_dir(tmp_path):
+    (tmp_path / "lib.c").write_text("int add(int a, int b)\n{\n    return a + b;\n}\n")
+    (tmp_path / "test_a.c").write_text("int main()\n{\n    return 0;\n}\n")
+    (tmp_path / "test_b.c").write_text("int main()\n{\n    return 1;\n}\n")
+    return str(tmp_path)
+
+
+def test_instrument_files_multi_target(multi_target_dir):
+    c_files, file_lens, file_to_lf, main_files, file_to_functions = instrument_files(multi_target_dir,
+                                                                                     multi_target=True)
+
+    assert sorted(os.path.basename(f) for f in c_files) == ['lib.c', 'test_a.c', 'test_b.c']
+    assert sorted(os.path.basename(f) for f in main_files) == ['test_a.c', 'test_b.c']
+    assert sorted(f.name for functions in file_to_functions.values() for f in functions) == ['add', 'main', 'main']
+
+
+def test_instrument_files_multiple_mains_without_multi_target(multi_target_dir):
+    with pytest.raises(AssertionError):
+        instrument_files(multi_target_dir)
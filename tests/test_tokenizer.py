@@ -0,0 +1,134 @@
+import glob
+import pytest
+from unittest.mock import patch
+
+from pycparser import parse_file
+
+from src.instrumentation import get_instrumentation_info
+from src.tokenizer import get_fast_instrumentation_info, tokenize
+
+
+c_files = sorted(glob.glob('tests/cfiles/*/*.c')) + sorted(glob.glob('benchmark/*_uninstrumented.c'))
+
+
+@pytest.mark.parametrize('c_file', c_files)
+def test_fast_frontend_matches_pycparser(c_file):
+    instrumentation_info, main_coords, functions = get_instrumentation_info(c_file)
+    result = get_fast_instrumentation_info(c_file)
+
+    assert result is not None, "The fast front end should handle the test suites"
+    fast_instrumentation_info, fast_main_coords, fast_functions = result
+
+    assert fast_instrumentation_info == instrumentation_info
+    assert fast_functions == functions
+    if main_coords is None:
+        assert fast_main_coords is None
+    else:
+        assert (fast_main_coords.line, fast_main_coords.column) == (main_coords.line, main_coords.column)
+
+
+c_file_content = """
+#include <stdio.h>
+#include <stdlib.h>
+
+typedef struct point { int x, y; } point_t;
+
+static int table[] = {1, 2, 3};
+
+int scale(point_t *p, int by)
+{
+    point_t q;
+\tq.x = p->x * by; q.y = 0;
+    if (by > 1 /* comment */) {
+        printf("%d\\n",
+               q.x);
+    } else {
+        by++;
+    }
+    for (int i = 0; i < 3; i++) q.y += table[i];
+    return q.x + q.y;
+}
+
+int main()
+{
+    point_t p;
+    size_t n = 1;
+    p.x = 2; p.y = 3;
+    scale(&p, 2);
+    switch (p.x) {
+    case 1:
+        return EXIT_FAILURE;
+    default:
+        break;
+    }
+    return 0;
+}
+"""
+
+
+@pytest.fixture
+def c_file(tmp_path):
+    temp_c_file = tmp_path / "point.c"
+    temp_c_file.write_text(c_file_content)
+    return str(temp_c_file)
+
+
+def test_fast_frontend_matches_pycparser_with_real_file(c_file):
+    instrumentation_info, main_coords, functions = get_instrumentation_info(c_file)
+    fast_instrumentation_info, fast_main_coords, fast_functions = get_fast_instrumentation_info(c_file)
+
+    assert fast_instrumentation_info == instrumentation_info
+    assert fast_functions == functions
+    assert (fast_main_coords.line, fast_main_coords.column) == (main_coords.line, main_coords.column)
+
+
+@pytest.mark.parametrize('body, headers', [
+    # the preprocessor would shift the column of the call
+    ("    EXIT_SUCCESS; foo();\n", {}),
+    # casts have nodes without coordinates
+    ("    int x = (int)1.5;\n", {}),
+    # calls in the condition of a while loop
+    ("    while (foo()) {}\n", {}),
+    # unknown type
+    ("    my_type *x;\n", {}),
+    # headers including each other behind include guards, the guards aren't evaluated
+    ("    foo();\n", {"a.h": "#ifndef A_H\n#define A_H\n#include \"b.h\"\n#endif\n",
+                    "b.h": "#ifndef B_H\n#define B_H\n#include \"a.h\"\n#endif\n"}),
+    # the preprocessor keeps only one of the definitions
+    ("    N;\n", {"cond.h": "#if 1\n#define N g(1)\n#else\n#define N 2\n#endif\n"}),
+    ("    N;\n", {"redefined.h": "#define N g(1)\n#define N 2\n"}),
+    ("    my_type *x;\n", {"typedef.h": "#ifdef WITH_MY_TYPE\ntypedef int my_type;\n#endif\n"}),
+])
+def test_fast_frontend_falls_back(tmp_path, body, headers):
+    for name, content in headers.items():
+        (tmp_path / name).write_text(content)
+    includes = "".join(f'#include "{name}"\n' for name in headers)
+    temp_c_file = tmp_path / "fallback.c"
+    temp_c_file.write_text(includes + "#include <stdlib.h>\nint foo();\nint main() {\n" + body + "}\n")
+
+    assert get_fast_instrumentation_info(str(temp_c_file)) is None
+
+
+def test_fast_frontend_falls_back_on_conditional_compilation(tmp_path):
+    temp_c_file = tmp_path / "ifdef.c"
+    temp_c_file.write_text("int main() {\n#ifdef DEBUG\n    foo();\n#endif\n    return 0;\n}\n")
+
+    assert get_fast_instrumentation_info(str(temp_c_file)) is None
+
+
+def test_fast_frontend_fallback_is_used(tmp_path):
+    temp_c_file = tmp_path / "while.c"
+    temp_c_file.write_text("int foo();\nint main() {\n    while (foo()) {}\n    return 0;\n}\n")
+
+    with patch('src.instrumentation.parse_file', wraps=parse_file) as mock_parse_file:
+        get_instrumentation_info(str(temp_c_file), fast_frontend=True)
+
+    mock_parse_file.assert_called_once()
+
+
+def test_tokenize():
+    tokens = tokenize('#include "a.h"\nint x = 1; // comment\n\tx += a->b;\n')
+
+    assert [t.text for t in tokens] == ['#include "a.h"', 'int', 'x', '=', '1', ';', 'x', '+=', 'a', '->', 'b', ';']
+    assert tokens[0].kind == 'directive'
+    assert (tokens[6].line, tokens[6].column) == (3, 2)